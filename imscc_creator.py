@@ -10,57 +10,146 @@ Usage:
   python imscc_creator.py --input lesson_data.json --output course.imscc --base-url https://example.com/rise/
   python imscc_creator.py --input lesson_data.csv --output course.imscc --base-url https://example.com/rise/
   python imscc_creator.py --extract und.js --output course.imscc --base-url https://example.com/rise/
+  python imscc_creator.py --input lesson_data.json --output course.imscc --base-url https://example.com/rise/ --compress-level 0
 """
 
 import os
 import sys
-import shutil
 import zipfile
 import uuid
 import html
 import re
 import argparse
-import json
 import hashlib
 import csv
-import base64
-from datetime import datetime
+import binascii
+import io
+import mmap
+from datetime import date
+
+# Prefer orjson's faster parser when it is installed
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# pybase64 is a drop-in, SIMD-accelerated replacement for the base64 module
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# CSV files at least this large are read with pyarrow when it is installed
+_ARROW_CSV_MIN_BYTES = 32 * 1024 * 1024
+
+# Literal that precedes the course payload in a well-formed und.js
+_JSONP_PREFIX = b'__resolveJsonp("course:und","'
+# Literal shared by every format the extractor accepts
+_JSONP_CALL = b'__resolveJsonp('
+
+# Patterns used to locate the course payload in und.js, compiled once at import;
+# they run over the raw (memory-mapped) file bytes
+_JSONP_RE = re.compile(rb'__resolveJsonp\("course:und","([^"]+)"\)')
+_ALT_JSONP_RE = re.compile(rb'__resolveJsonp\([^,]+,\s*"([^"]+)"\)')
+
+# Pattern used to build lesson filenames, compiled once at import
+_SLUG_RE = re.compile(r'[^a-z0-9]+')
+
+# Canvas-compatible lesson page; only the title (twice) and the iframe URL vary
+_LESSON_PAGE_TEMPLATE = (
+    '<!DOCTYPE html>\n'
+    '<html>\n'
+    '<head>\n'
+    '  <meta charset="UTF-8">\n'
+    '  <meta name="viewport" content="width=device-width, initial-scale=1.0">\n'
+    '  <title>%s</title>\n'
+    '  <style>\n'
+    '    body { font-family: Arial, sans-serif; line-height: 1.6; margin: 0; padding: 20px; }\n'
+    '    h1 { color: #333; margin-bottom: 20px; }\n'
+    '    .iframe-container { width: 100%%; height: 800px; border: 1px solid #ddd; margin: 20px 0; }\n'
+    '    iframe { border: none; width: 100%%; height: 100%%; }\n'
+    '  </style>\n'
+    '</head>\n'
+    '<body>\n'
+    '  <h1>%s</h1>\n'
+    '  <div class="iframe-container">\n'
+    '    <iframe src="%s" allowfullscreen></iframe>\n'
+    '  </div>\n'
+    '  <p><small>This content is embedded from an external source.</small></p>\n'
+    '</body>\n'
+    '</html>\n'
+)
+
+def find_jsonp_payload(file_content):
+    """
+    Locate the base64 payload in the raw contents of a Rise und.js file.
+    
+    Use this directly when the file is already in memory (e.g. an upload);
+    extract_jsonp_content does the same for a file on disk.
+    
+    Args:
+        file_content (bytes or mmap.mmap): Raw file contents
+    
+    Returns:
+        bytes: The payload or None if not found
+    """
+    # Every accepted format contains this literal; without it no regex can match
+    call_start = file_content.find(_JSONP_CALL)
+    if call_start < 0:
+        return None
+    
+    # Fast path: find the literal prefix and slice up to the closing '")'
+    start = file_content.find(_JSONP_PREFIX, call_start)
+    if start >= 0:
+        start += len(_JSONP_PREFIX)
+        end = file_content.find(b'"', start)
+        if end > start and file_content[end:end + 2] == b'")':
+            return file_content[start:end]
+    
+    # Match __resolveJsonp("course:und","....") format
+    match = _JSONP_RE.search(file_content)
+    
+    if match:
+        return match.group(1)
+    
+    # Try more flexible pattern as fallback
+    alt_match = _ALT_JSONP_RE.search(file_content)
+    if alt_match:
+        print("Using alternative pattern for extraction")
+        return alt_match.group(1)
+    
+    return None
 
-import streamlit as st
-st.title("IMSCC Creator")
-st.write("This application is running. If you can see this, the script is loaded correctly.")
 
 def extract_jsonp_content(file_path):
     """
     Extract the base64 encoded content from a Rise und.js file.
     
+    The file is memory-mapped rather than read, so only the pages that are
+    searched get loaded. The payload is returned as raw bytes, which
+    decode_base64_content accepts without another conversion.
+    
     Args:
         file_path (str): Path to the und.js file
     
     Returns:
-        str: Extracted base64 content or None if not found
+        bytes: Extracted base64 content or None if not found
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            file_content = file.read()
-        
-        # Pattern to match __resolveJsonp("course:und","....") format
-        pattern = r'__resolveJsonp\("course:und","([^"]+)"\)'
-        match = re.search(pattern, file_content)
+        with open(file_path, 'rb') as file:
+            # Empty files cannot be memory-mapped, and hold no payload anyway
+            if os.fstat(file.fileno()).st_size:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as file_content:
+                    payload = find_jsonp_payload(file_content)
+            else:
+                payload = None
         
-        if match:
-            return match.group(1)
+        if payload is None:
+            print("Could not find the expected format in the file.")
+            return None
         
-        # Try more flexible pattern as fallback
-        alternative_pattern = r'__resolveJsonp\([^,]+,\s*"([^"]+)"\)'
-        alt_match = re.search(alternative_pattern, file_content)
-        if alt_match:
-            print("Using alternative pattern for extraction")
-            return alt_match.group(1)
-        
-        print("Could not find the expected format in the file.")
-        return None
-    except Exception as e:
+        return payload
+    except (OSError, ValueError) as e:
         print(f"Error reading file: {str(e)}")
         return None
 
@@ -70,20 +159,17 @@ def decode_base64_content(base64_content):
     Decode base64 content to JSON.
     
     Args:
-        base64_content (str): Base64 encoded content
+        base64_content (bytes or str): Base64 encoded content
     
     Returns:
         dict: Decoded JSON data or None if decoding fails
     """
     try:
-        # Decode base64 to get JSON string
-        decoded_bytes = base64.b64decode(base64_content)
-        json_str = decoded_bytes.decode('utf-8')
-        
-        # Parse JSON string
-        json_data = json.loads(json_str)
-        return json_data
-    except Exception as e:
+        # The JSON parser detects UTF-8 itself, so the decoded bytes are
+        # parsed directly without building an intermediate str copy
+        return _json_loads(base64.b64decode(base64_content))
+    except (binascii.Error, ValueError) as e:
+        # Both JSON parsers raise ValueError subclasses on malformed input
         print(f"Error decoding content: {str(e)}")
         return None
 
@@ -99,51 +185,41 @@ def extract_lesson_data(json_data):
         list: List of dictionaries containing title and id for each lesson
     """
     lessons_data = []
-    lessons = None
     
-    # Method 1: Direct lookup for 'lessons' key
-    if 'lessons' in json_data:
-        lessons = json_data['lessons']
+    # Method 1: Direct lookup for 'lessons' key; a non-empty one skips the
+    # scan below entirely
+    lessons = json_data.get('lessons')
+    if lessons is not None:
         print(f"Found direct 'lessons' key with {len(lessons)} items")
     
     # Method 2: Look for arrays that might contain lessons
     if not lessons:
-        candidates = []
+        # Keep only the best (proportion, key, value) seen so far
+        best = (0.0, None, None)
         for key, value in json_data.items():
             if isinstance(value, list) and len(value) > 0:
                 # Check first few items to see if they look like lessons
-                sample_size = min(5, len(value))
-                sample_items = value[:sample_size]
+                sample_items = value[:5]
                 
                 has_title_id = sum(1 for item in sample_items 
                                  if isinstance(item, dict) and 'title' in item and 'id' in item)
                 
-                if has_title_id > 0:
-                    candidates.append((key, value, has_title_id/sample_size))
-        
-        # Sort candidates by the proportion that have title and id
-        candidates.sort(key=lambda x: x[2], reverse=True)
+                proportion = has_title_id / len(sample_items)
+                if proportion > best[0]:
+                    best = (proportion, key, value)
+                    # Nothing can beat a full match
+                    if proportion == 1.0:
+                        break
         
-        if candidates:
-            best_candidate = candidates[0]
-            lessons = best_candidate[1]
-            print(f"Found potential lessons array in '{best_candidate[0]}' with {len(lessons)} items")
+        if best[2] is not None:
+            lessons = best[2]
+            print(f"Found potential lessons array in '{best[1]}' with {len(lessons)} items")
     
-    # Extract data from the lessons if found
+    # Extract id and title (when present) from lessons that have at least an id
     if lessons:
-        for lesson in lessons:
-            if isinstance(lesson, dict):
-                lesson_data = {}
-                
-                # Always include id and title if available
-                if 'id' in lesson:
-                    lesson_data['id'] = lesson['id']
-                if 'title' in lesson:
-                    lesson_data['title'] = lesson['title']
-                
-                # Only add if we have at least an id
-                if 'id' in lesson_data:
-                    lessons_data.append(lesson_data)
+        lessons_data = [{key: lesson[key] for key in ('id', 'title') if key in lesson}
+                        for lesson in lessons
+                        if isinstance(lesson, dict) and 'id' in lesson]
     
     # If no lessons found, show error
     if not lessons_data:
@@ -152,292 +228,348 @@ def extract_lesson_data(json_data):
     return lessons_data
 
 
-# Update the directory structure creation function
-def create_directory_structure(base_dir):
-    """
-    Create the directory structure required for a Canvas-compatible IMSCC package
-    
-    Args:
-        base_dir (str): Base directory where the structure will be created
-        
-    Returns:
-        dict: Paths to important directories
-    """
-    # Ensure base directory exists
-    os.makedirs(base_dir, exist_ok=True)
-    
-    # Create required directories for Canvas
-    paths = {
-        'root': base_dir,
-        'wiki_content': os.path.join(base_dir, 'wiki_content'),  # Canvas expects pages in wiki_content
-        'course_settings': os.path.join(base_dir, 'course_settings'),
-    }
-    
-    for path in paths.values():
-        os.makedirs(path, exist_ok=True)
-    
-    return paths
-
-def create_canvas_settings(paths, course_title):
+def create_canvas_settings(imscc_zip, course_title):
     """
     Create Canvas-specific course settings files
     
     Args:
-        paths (dict): Directory paths
+        imscc_zip (zipfile.ZipFile): Open package to write the files into
         course_title (str): Title of the course
     """
     # Create canvas_export.txt
-    with open(os.path.join(paths['course_settings'], 'canvas_export.txt'), 'w', encoding='utf-8') as f:
-        f.write("Canvas Course Export")
+    imscc_zip.writestr('course_settings/canvas_export.txt', "Canvas Course Export")
     
     # Create minimal course_settings.xml
-    course_settings = '<?xml version="1.0" encoding="UTF-8"?>\n'
-    course_settings += '<course identifier="default_identifier" xmlns="http://canvas.instructure.com/xsd/cccv1p0" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://canvas.instructure.com/xsd/cccv1p0 https://canvas.instructure.com/xsd/cccv1p0.xsd">\n'
-    course_settings += f'  <title>{html.escape(course_title)}</title>\n'
-    course_settings += '  <course_code>Imported Course</course_code>\n'
-    course_settings += '  <visibility>private</visibility>\n'
-    course_settings += '</course>\n'
+    course_settings = ''.join([
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        '<course identifier="default_identifier" xmlns="http://canvas.instructure.com/xsd/cccv1p0" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://canvas.instructure.com/xsd/cccv1p0 https://canvas.instructure.com/xsd/cccv1p0.xsd">\n',
+        f'  <title>{html.escape(course_title)}</title>\n',
+        '  <course_code>Imported Course</course_code>\n',
+        '  <visibility>private</visibility>\n',
+        '</course>\n',
+    ])
+    
+    imscc_zip.writestr('course_settings/course_settings.xml', course_settings)
+
+def _lesson_filename(lesson_title, used_filenames):
+    """
+    Build a unique page file name for a lesson from its title
     
-    with open(os.path.join(paths['course_settings'], 'course_settings.xml'), 'w', encoding='utf-8') as f:
-        f.write(course_settings)
+    Args:
+        lesson_title (str): Title of the lesson
+        used_filenames (set): File names handed out so far; the new name is added
+        
+    Returns:
+        str: File name such as 'intro.html'
+    """
+    # Convert to lowercase, replace spaces and special chars with hyphens,
+    # then remove leading/trailing hyphens
+    stem = _SLUG_RE.sub('-', lesson_title.lower()).strip('-')
+    # Add .html extension; titles that slug the same (repeated "Quiz"
+    # lessons, titles with no Latin characters) get -2, -3, ... so each
+    # page has its own entry in the package
+    filename = stem + '.html'
+    if filename in used_filenames:
+        suffix = 2
+        while f'{stem}-{suffix}.html' in used_filenames:
+            suffix += 1
+        filename = f'{stem}-{suffix}.html'
+    used_filenames.add(filename)
+    return filename
+
 
 # Update the manifest creation function to use titles for filenames
-def create_manifest(paths, course_title, lessons, org_id="org_1"):
+def create_manifest(imscc_zip, course_title, lessons, org_id="org_1"):
     """
     Create the imsmanifest.xml file needed for the IMSCC package in Canvas format
     with proper matching identifiers between organization items and resources.
     
     Args:
-        paths (dict): Directory paths
+        imscc_zip (zipfile.ZipFile): Open package to write the manifest into
         course_title (str): Title of the course
         lessons (list): List of lesson dictionaries
         org_id (str): Organization ID for the manifest
         
     Returns:
-        str: Path to the created manifest file
+        str: Name of the manifest entry in the package
     """
-    manifest_path = os.path.join(paths['root'], 'imsmanifest.xml')
+    manifest_name = 'imsmanifest.xml'
     
     # Generate unique identifier for Canvas
-    course_id = "course_" + str(uuid.uuid4()).replace('-', '')
-    
-    # Start building manifest XML with Canvas-compatible format
-    manifest = '<?xml version="1.0" encoding="UTF-8"?>\n'
-    manifest += '<manifest identifier="{}" '.format(course_id)
-    manifest += 'xmlns="http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1" '
-    manifest += 'xmlns:lom="http://ltsc.ieee.org/xsd/imsccv1p1/LOM/resource" '
-    manifest += 'xmlns:lomimscc="http://ltsc.ieee.org/xsd/imsccv1p1/LOM/manifest" '
-    manifest += 'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
-    manifest += 'xsi:schemaLocation="http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1 '
-    manifest += 'http://www.imsglobal.org/profile/cc/ccv1p1/ccv1p1_imscp_v1p2_v1p0.xsd '
-    manifest += 'http://ltsc.ieee.org/xsd/imsccv1p1/LOM/resource '
-    manifest += 'http://www.imsglobal.org/profile/cc/ccv1p1/LOM/ccv1p1_lomresource_v1p0.xsd '
-    manifest += 'http://ltsc.ieee.org/xsd/imsccv1p1/LOM/manifest '
-    manifest += 'http://www.imsglobal.org/profile/cc/ccv1p1/LOM/ccv1p1_lommanifest_v1p0.xsd">\n'
-    
-    # Metadata section in Canvas format
-    manifest += '  <metadata>\n'
-    manifest += '    <schema>IMS Common Cartridge</schema>\n'
-    manifest += '    <schemaversion>1.1.0</schemaversion>\n'
-    manifest += '    <lomimscc:lom>\n'
-    manifest += '      <lomimscc:general>\n'
-    manifest += '        <lomimscc:title>\n'
-    manifest += '          <lomimscc:string>{}</lomimscc:string>\n'.format(html.escape(course_title))
-    manifest += '        </lomimscc:title>\n'
-    manifest += '      </lomimscc:general>\n'
-    manifest += '      <lomimscc:lifeCycle>\n'
-    manifest += '        <lomimscc:contribute>\n'
-    manifest += '          <lomimscc:date>\n'
-    manifest += '            <lomimscc:dateTime>{}</lomimscc:dateTime>\n'.format(datetime.now().strftime("%Y-%m-%d"))
-    manifest += '          </lomimscc:date>\n'
-    manifest += '        </lomimscc:contribute>\n'
-    manifest += '      </lomimscc:lifeCycle>\n'
-    manifest += '      <lomimscc:rights>\n'
-    manifest += '        <lomimscc:copyrightAndOtherRestrictions>\n'
-    manifest += '          <lomimscc:value>yes</lomimscc:value>\n'
-    manifest += '        </lomimscc:copyrightAndOtherRestrictions>\n'
-    manifest += '        <lomimscc:description>\n'
-    manifest += '          <lomimscc:string>Private (Copyrighted) - http://en.wikipedia.org/wiki/Copyright</lomimscc:string>\n'
-    manifest += '        </lomimscc:description>\n'
-    manifest += '      </lomimscc:rights>\n'
-    manifest += '    </lomimscc:lom>\n'
-    manifest += '  </metadata>\n'
-    
-    # Organizations section in Canvas format
-    manifest += '  <organizations>\n'
-    manifest += '    <organization identifier="{}" structure="rooted-hierarchy">\n'.format(org_id)
-    manifest += '      <item identifier="LearningModules">\n'
-    
-    # Add module for the lessons
-    module_id = "g" + re.sub(r'[^a-zA-Z0-9]', '', str(uuid.uuid4()))
-    manifest += '        <item identifier="{}">\n'.format(module_id)
-    manifest += '          <title>{}</title>\n'.format(html.escape(course_title))
-    
-    # Process each lesson and generate necessary IDs up front
-    for lesson in lessons:
-        lesson_id = lesson['id']
-        lesson_title = lesson.get('title', 'Untitled Lesson')
+    course_id = "course_" + uuid.uuid4().hex
+    
+    # The course title appears twice in the manifest; escape it once
+    escaped_course_title = html.escape(course_title)
+    
+    # Stream the manifest XML into the package as it is built, encoded as
+    # UTF-8 with no BOM, rather than holding the whole document in memory
+    entry = imscc_zip.open(manifest_name, 'w')
+    with io.TextIOWrapper(entry, encoding='utf-8', newline='') as manifest:
+        write = manifest.write
         
-        # Create stable, unique resource ID for this lesson 
-        # Use a deterministic approach based on the lesson ID to ensure consistency
-        resource_id = "g" + re.sub(r'[^a-zA-Z0-9]', '', 
-                                   hashlib.md5(lesson_id.encode('utf-8')).hexdigest()[:24])
+        # Start the manifest XML with Canvas-compatible format
+        write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        write(f'<manifest identifier="{course_id}" ')
+        write('xmlns="http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1" ')
+        write('xmlns:lom="http://ltsc.ieee.org/xsd/imsccv1p1/LOM/resource" ')
+        write('xmlns:lomimscc="http://ltsc.ieee.org/xsd/imsccv1p1/LOM/manifest" ')
+        write('xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" ')
+        write('xsi:schemaLocation="http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1 ')
+        write('http://www.imsglobal.org/profile/cc/ccv1p1/ccv1p1_imscp_v1p2_v1p0.xsd ')
+        write('http://ltsc.ieee.org/xsd/imsccv1p1/LOM/resource ')
+        write('http://www.imsglobal.org/profile/cc/ccv1p1/LOM/ccv1p1_lomresource_v1p0.xsd ')
+        write('http://ltsc.ieee.org/xsd/imsccv1p1/LOM/manifest ')
+        write('http://www.imsglobal.org/profile/cc/ccv1p1/LOM/ccv1p1_lommanifest_v1p0.xsd">\n')
         
-        # Create item ID that's different from resource ID
-        item_id = "g" + re.sub(r'[^a-zA-Z0-9]', '', 
-                               hashlib.md5((lesson_id + "_item").encode('utf-8')).hexdigest()[:24])
+        # Metadata section in Canvas format
+        write('  <metadata>\n')
+        write('    <schema>IMS Common Cartridge</schema>\n')
+        write('    <schemaversion>1.1.0</schemaversion>\n')
+        write('    <lomimscc:lom>\n')
+        write('      <lomimscc:general>\n')
+        write('        <lomimscc:title>\n')
+        write(f'          <lomimscc:string>{escaped_course_title}</lomimscc:string>\n')
+        write('        </lomimscc:title>\n')
+        write('      </lomimscc:general>\n')
+        write('      <lomimscc:lifeCycle>\n')
+        write('        <lomimscc:contribute>\n')
+        write('          <lomimscc:date>\n')
+        write(f'            <lomimscc:dateTime>{date.today().isoformat()}</lomimscc:dateTime>\n')
+        write('          </lomimscc:date>\n')
+        write('        </lomimscc:contribute>\n')
+        write('      </lomimscc:lifeCycle>\n')
+        write('      <lomimscc:rights>\n')
+        write('        <lomimscc:copyrightAndOtherRestrictions>\n')
+        write('          <lomimscc:value>yes</lomimscc:value>\n')
+        write('        </lomimscc:copyrightAndOtherRestrictions>\n')
+        write('        <lomimscc:description>\n')
+        write('          <lomimscc:string>Private (Copyrighted) - http://en.wikipedia.org/wiki/Copyright</lomimscc:string>\n')
+        write('        </lomimscc:description>\n')
+        write('      </lomimscc:rights>\n')
+        write('    </lomimscc:lom>\n')
+        write('  </metadata>\n')
         
-        # Use the title to create the filename
-        # Convert to lowercase, replace spaces and special chars with hyphens
-        filename = lesson_title.lower()
-        # Replace spaces and special characters with hyphens
-        filename = re.sub(r'[^a-z0-9]+', '-', filename)
-        # Remove leading/trailing hyphens
-        filename = filename.strip('-')
-        # Add .html extension
-        filename = filename + '.html'
+        # Organizations section in Canvas format
+        write('  <organizations>\n')
+        write(f'    <organization identifier="{org_id}" structure="rooted-hierarchy">\n')
+        write('      <item identifier="LearningModules">\n')
         
-        # Store IDs and filename for later use in resources section
-        lesson['filename'] = filename
-        lesson['resource_id'] = resource_id
-        lesson['item_id'] = item_id
+        # Add module for the lessons
+        module_id = "g" + uuid.uuid4().hex
+        write(f'        <item identifier="{module_id}">\n')
+        write(f'          <title>{escaped_course_title}</title>\n')
         
-        # Add item to organizations section
-        manifest += '          <item identifier="{}" identifierref="{}">\n'.format(item_id, resource_id)
-        manifest += '            <title>{}</title>\n'.format(html.escape(lesson_title))
-        manifest += '          </item>\n'
-    
-    # Close organization structure
-    manifest += '        </item>\n'
-    manifest += '      </item>\n'
-    manifest += '    </organization>\n'
-    manifest += '  </organizations>\n'
-    
-    # Resources section in Canvas format
-    manifest += '  <resources>\n'
-    
-    # Add course settings resource for Canvas
-    settings_id = "g" + re.sub(r'[^a-zA-Z0-9]', '', str(uuid.uuid4()))
-    manifest += '    <resource identifier="{}" type="associatedcontent/imscc_xmlv1p1/learning-application-resource" href="course_settings/canvas_export.txt">\n'.format(settings_id)
-    manifest += '      <file href="course_settings/course_settings.xml"/>\n'
-    manifest += '      <file href="course_settings/canvas_export.txt"/>\n'
-    manifest += '    </resource>\n'
-    
-    # Add resource for each lesson using the same resource_id that was referenced in the organizations section
-    for lesson in lessons:
-        resource_id = lesson['resource_id']  # Use the same ID that was referenced earlier
-        filename = lesson['filename']
+        # Process each lesson in a single pass; its resource entry is collected
+        # alongside and emitted once the organizations section is closed
+        resource_parts = []
+        # Page file names handed out so far
+        used_filenames = set()
+        # Bind the per-lesson callables to locals for the loop
+        escape = html.escape
+        md5 = hashlib.md5
+        append_resource = resource_parts.append
+        for lesson in lessons:
+            lesson_id = lesson['id']
+            lesson_title = lesson.get('title', 'Untitled Lesson')
+            
+            # Create stable, unique resource ID for this lesson 
+            # Use a deterministic approach based on the lesson ID to ensure consistency
+            # (hex digests are already alphanumeric, so they need no sanitizing)
+            resource_id = "g" + md5(lesson_id.encode('utf-8')).hexdigest()[:24]
+            
+            # Create item ID that's different from resource ID
+            item_id = "g" + md5((lesson_id + "_item").encode('utf-8')).hexdigest()[:24]
+            
+            # Use the title to create the filename
+            filename = _lesson_filename(lesson_title, used_filenames)
+            
+            # Escape the title once; the lesson page reuses it
+            escaped_title = escape(lesson_title)
+            
+            # Store IDs, filename and title for later use when creating the lesson pages
+            lesson['filename'] = filename
+            lesson['resource_id'] = resource_id
+            lesson['item_id'] = item_id
+            lesson['escaped_title'] = escaped_title
+            
+            # Add item to organizations section
+            write(f'          <item identifier="{item_id}" identifierref="{resource_id}">\n')
+            write(f'            <title>{escaped_title}</title>\n')
+            write('          </item>\n')
+            
+            # Add resource using the same resource_id referenced by the item
+            append_resource(f'    <resource identifier="{resource_id}" type="webcontent" href="wiki_content/{filename}">\n')
+            append_resource(f'      <file href="wiki_content/{filename}"/>\n')
+            append_resource('    </resource>\n')
         
-        manifest += '    <resource identifier="{}" type="webcontent" href="wiki_content/{}">\n'.format(
-            resource_id, filename)
-        manifest += '      <file href="wiki_content/{}"/>\n'.format(filename)
-        manifest += '    </resource>\n'
-    
-    manifest += '  </resources>\n'
-    manifest += '</manifest>\n'
-    
-    # Write manifest to file - ensure no BOM and clean beginning
-    with open(manifest_path, 'w', encoding='utf-8', newline='') as f:
-        f.write(manifest)
+        # Close organization structure
+        write('        </item>\n')
+        write('      </item>\n')
+        write('    </organization>\n')
+        write('  </organizations>\n')
+        
+        # Resources section in Canvas format
+        write('  <resources>\n')
+        
+        # Add course settings resource for Canvas
+        settings_id = "g" + uuid.uuid4().hex
+        write(f'    <resource identifier="{settings_id}" type="associatedcontent/imscc_xmlv1p1/learning-application-resource" href="course_settings/canvas_export.txt">\n')
+        write('      <file href="course_settings/course_settings.xml"/>\n')
+        write('      <file href="course_settings/canvas_export.txt"/>\n')
+        write('    </resource>\n')
+        
+        # Add the resource for each lesson collected above
+        manifest.writelines(resource_parts)
+        
+        write('  </resources>\n')
+        write('</manifest>\n')
     
     # Create course settings file for Canvas
-    create_canvas_settings(paths, course_title)
+    create_canvas_settings(imscc_zip, course_title)
     
-    return manifest_path
+    return manifest_name
 
 # Update the page creation function to preserve title consistency
-def create_lesson_pages(paths, lessons, base_url):
+def create_lesson_pages(imscc_zip, lessons, base_url):
     """
     Create HTML pages for each lesson with an iframe in Canvas format
     
     Args:
-        paths (dict): Directory paths
-        lessons (list): List of lesson dictionaries
+        imscc_zip (zipfile.ZipFile): Open package to write the pages into
+        lessons (list): List of lesson dictionaries, as annotated by create_manifest.
+            Call create_manifest first so the page names match the manifest;
+            lessons without its annotations get their file names computed here
         base_url (str): Base URL to combine with lesson IDs
         
     Returns:
-        list: Paths to the created HTML files
+        list: Names of the HTML entries in the package
     """
     html_files = []
     
+    # Normalize and escape the base URL once; only the lesson ID varies per page
+    if not base_url.endswith('/'):
+        base_url += '/'
+    escaped_base_url = html.escape(base_url)
+    
+    # Bind the per-lesson callables to locals for the loop
+    escape = html.escape
+    writestr = imscc_zip.writestr
+    append_file = html_files.append
+    
+    # Names given to lessons that create_manifest has not annotated
+    used_filenames = set()
+    
     for lesson in lessons:
         lesson_id = lesson['id']
-        lesson_title = lesson.get('title', 'Untitled Lesson')
-        filename = lesson.get('filename')
-        
-        # If filename wasn't set in the manifest creation, create it here (fallback)
-        if not filename:
-            filename = lesson_title.lower()
-            filename = re.sub(r'[^a-z0-9]+', '-', filename)
-            filename = filename.strip('-') + '.html'
+        # Filename and escaped title are set by create_manifest so that page
+        # names always match the manifest's resource hrefs; lessons it has not
+        # seen get the same values computed here
+        if 'filename' not in lesson:
+            lesson_title = lesson.get('title', 'Untitled Lesson')
+            lesson['filename'] = _lesson_filename(lesson_title, used_filenames)
+            lesson['escaped_title'] = escape(lesson_title)
+        escaped_title = lesson['escaped_title']
+        page_name = 'wiki_content/' + lesson['filename']
         
-        file_path = os.path.join(paths['wiki_content'], filename)
-        
-        # Format the iframe URL
-        iframe_url = base_url
-        if not iframe_url.endswith('/'):
-            iframe_url += '/'
-        iframe_url += lesson_id
+        # Format the iframe URL; HTML escaping works per character, so escaping
+        # the two parts separately matches escaping the joined URL
+        iframe_url = escaped_base_url + escape(lesson_id)
         
         # Create HTML content with iframe in Canvas-compatible format
-        html_content = '<!DOCTYPE html>\n'
-        html_content += '<html>\n'
-        html_content += '<head>\n'
-        html_content += '  <meta charset="UTF-8">\n'
-        html_content += '  <meta name="viewport" content="width=device-width, initial-scale=1.0">\n'
-        html_content += f'  <title>{html.escape(lesson_title)}</title>\n'
-        html_content += '  <style>\n'
-        html_content += '    body { font-family: Arial, sans-serif; line-height: 1.6; margin: 0; padding: 20px; }\n'
-        html_content += '    h1 { color: #333; margin-bottom: 20px; }\n'
-        html_content += '    .iframe-container { width: 100%; height: 800px; border: 1px solid #ddd; margin: 20px 0; }\n'
-        html_content += '    iframe { border: none; width: 100%; height: 100%; }\n'
-        html_content += '  </style>\n'
-        html_content += '</head>\n'
-        html_content += '<body>\n'
-        html_content += f'  <h1>{html.escape(lesson_title)}</h1>\n'
-        html_content += '  <div class="iframe-container">\n'
-        html_content += f'    <iframe src="{html.escape(iframe_url)}" allowfullscreen></iframe>\n'
-        html_content += '  </div>\n'
-        html_content += '  <p><small>This content is embedded from an external source.</small></p>\n'
-        html_content += '</body>\n'
-        html_content += '</html>\n'
+        html_content = _LESSON_PAGE_TEMPLATE % (escaped_title, escaped_title, iframe_url)
         
-        # Write HTML to file
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        # Write HTML into the package
+        writestr(page_name, html_content)
         
-        html_files.append(file_path)
+        append_file(page_name)
     
     return html_files
 
 
-def create_imscc_package(paths, output_path):
+def create_imscc_package(output_path, compresslevel=1):
     """
-    Create the final IMSCC package as a ZIP file
+    Open the IMSCC package as a ZIP file ready for writing
     
     Args:
-        paths (dict): Directory paths
-        output_path (str): Path for the output IMSCC file
+        output_path (str or file-like): Path for the output IMSCC file, or a
+            writable binary file object such as io.BytesIO
+        compresslevel (int, optional): Deflate level from 1 to 9, or 0 to store
+            entries uncompressed (fastest when the package is re-zipped
+            downstream). Defaults to 1.
         
     Returns:
-        str: Path to the created IMSCC file
+        zipfile.ZipFile: The open package; the caller is responsible for closing it
     """
     # Ensure output directory exists
-    output_dir = os.path.dirname(output_path)
-    if output_dir:
-        os.makedirs(output_dir, exist_ok=True)
-    
-    # Create ZIP file with the .imscc extension
-    with zipfile.ZipFile(output_path, 'w') as imscc_zip:
-        # Walk through the directory structure and add all files
-        for root, _, files in os.walk(paths['root']):
-            for file in files:
-                file_path = os.path.join(root, file)
-                # Get the relative path from the base directory
-                rel_path = os.path.relpath(file_path, paths['root'])
-                imscc_zip.write(file_path, rel_path)
+    if isinstance(output_path, (str, os.PathLike)):
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+    
+    # Level 0 means no compression at all
+    if not compresslevel:
+        return zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_STORED)
+    
+    # Create ZIP file with the .imscc extension; the lesson pages share almost
+    # all of their markup, so even the fastest level deflates them well
+    return zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_DEFLATED,
+                           compresslevel=compresslevel)
+
+
+def _load_csv_lessons_arrow(file_path):
+    """
+    Load lesson data from a large CSV file with pyarrow's native CSV reader
     
-    return output_path
+    Args:
+        file_path (str): Path to the CSV file
+        
+    Returns:
+        list: List of lesson dictionaries, or None if the file is small, pyarrow
+            is not installed or it cannot parse the file (the csv module is
+            used instead)
+    """
+    # Importing pyarrow costs far more than parsing a typical lesson list, so
+    # only large files are worth handing to it
+    if os.path.getsize(file_path) < _ARROW_CSV_MIN_BYTES:
+        return None
+    
+    # Imported here so the CLI only loads pyarrow when it reads a large CSV
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        return None
+    
+    # Only the id and title columns are read, so other columns are never
+    # type-inferred; repeated names are left to the csv module
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        header = next(csv.reader(f), [])
+    columns = [name for name in ('id', 'title') if name in header]
+    if 'id' not in columns or any(header.count(name) > 1 for name in columns):
+        return None
+    
+    try:
+        table = pa_csv.read_csv(
+            file_path,
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            # Keep IDs as strings, as the csv module returns them
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in columns},
+                include_columns=columns,
+            ),
+        )
+        ids = table.column('id').to_pylist()
+        titles = table.column('title').to_pylist() if 'title' in columns else None
+    except (KeyError, pa.ArrowException):
+        # Rows with missing columns, invalid UTF-8 and anything else the
+        # native reader rejects
+        return None
+    
+    if titles is None:
+        return [{'id': lesson_id} for lesson_id in ids]
+    # As in the csv module path, a missing title leaves the key out
+    return [{'id': lesson_id, 'title': title} if title is not None else {'id': lesson_id}
+            for lesson_id, title in zip(ids, titles)]
 
 
 def load_lessons_from_file(file_path):
@@ -455,8 +587,8 @@ def load_lessons_from_file(file_path):
     # Load JSON file
     if file_ext == '.json':
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(file_path, 'rb') as f:
+                data = _json_loads(f.read())
             
             # If data is a list, assume it's already in the correct format
             if isinstance(data, list):
@@ -468,24 +600,39 @@ def load_lessons_from_file(file_path):
             
             # Otherwise, return empty list
             return []
-        except Exception as e:
+        except (OSError, ValueError) as e:
             print(f"Error loading JSON file: {str(e)}")
             return []
     
     # Load CSV file
     elif file_ext == '.csv':
         try:
+            # Prefer the native reader for large files; fall back to the csv module
+            lessons = _load_csv_lessons_arrow(file_path)
+            if lessons is not None:
+                return lessons
+            
             lessons = []
             with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if 'id' in row:
-                        lesson = {'id': row['id']}
-                        if 'title' in row:
-                            lesson['title'] = row['title']
+                reader = csv.reader(f)
+                header = next(reader, [])
+                
+                # Look the columns up once instead of building a dict per row
+                if 'id' in header:
+                    idx_id = header.index('id')
+                    idx_title = header.index('title') if 'title' in header else -1
+                    for row in reader:
+                        # Skip blank rows and rows too short to hold an id
+                        if len(row) <= idx_id:
+                            continue
+                        lesson = {'id': row[idx_id]}
+                        # A row too short to hold a title leaves the key out, so
+                        # the 'Untitled Lesson' default applies downstream
+                        if 0 <= idx_title < len(row):
+                            lesson['title'] = row[idx_title]
                         lessons.append(lesson)
             return lessons
-        except Exception as e:
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
             print(f"Error loading CSV file: {str(e)}")
             return []
     
@@ -495,45 +642,160 @@ def load_lessons_from_file(file_path):
         return []
 
 
-def create_package(lessons, output_path, base_url, course_title=None, clean_temp=True):
+def _write_package(output, lessons, base_url, course_title, compresslevel):
+    """
+    Write the manifest, settings and lesson pages into a new package
+    
+    Args:
+        output (str or file-like): Path or writable binary file object
+        lessons (list): List of lesson dictionaries containing 'id' and 'title'
+        base_url (str): Base URL to combine with lesson IDs for iframes
+        course_title (str): Title of the course
+        compresslevel (int): Deflate level, or 0 to store entries uncompressed
+    """
+    with create_imscc_package(output, compresslevel) as imscc_zip:
+        # Create manifest
+        create_manifest(imscc_zip, course_title, lessons)
+        
+        # Create lesson pages
+        create_lesson_pages(imscc_zip, lessons, base_url)
+
+
+def create_package(lessons, output_path, base_url, course_title=None, clean_temp=True,
+                   compresslevel=1):
     """
     Main function to create an IMSCC package from lesson data
     
+    The manifest, settings and lesson pages are written straight into the
+    package. A package written to a path is renamed into place once complete;
+    a file object (e.g. io.BytesIO for an in-memory download) is written
+    directly.
+    
     Args:
         lessons (list): List of lesson dictionaries containing 'id' and 'title'
-        output_path (str): Path for the output IMSCC file
+        output_path (str or file-like): Path for the output IMSCC file, or a
+            writable binary file object
         base_url (str): Base URL to combine with lesson IDs for iframes
         course_title (str, optional): Title of the course. Defaults to "Rise Course Export".
-        clean_temp (bool, optional): Whether to clean up temporary files. Defaults to True.
+        clean_temp (bool, optional): Deprecated and ignored; no temporary
+            directory is created any more. Kept so existing callers still work.
+        compresslevel (int, optional): Deflate level from 1 to 9, or 0 to store
+            entries uncompressed (fastest when the package is re-zipped
+            downstream). Defaults to 1.
         
     Returns:
-        str: Path to the created IMSCC file
+        str or file-like: The output path or file object the package was written to
     """
-    # Use current timestamp for temp directory to avoid conflicts
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    temp_dir = os.path.join(os.path.dirname(output_path), f"temp_imscc_{timestamp}")
-    
     # Set default course title if not provided
     if not course_title:
         course_title = "Rise Course Export"
     
+    if not isinstance(output_path, (str, os.PathLike)):
+        _write_package(output_path, lessons, base_url, course_title, compresslevel)
+        return output_path
+    
+    # Build the package under a temporary name and move it into place once it
+    # is complete, so a failure never leaves a truncated .imscc behind. The
+    # name is unique per build, so concurrent builds of the same output never
+    # share a temporary file; it sits next to the output so os.replace stays
+    # on one filesystem. (tempfile.mkstemp would create the package with
+    # owner-only permissions.)
+    temp_path = f"{os.fspath(output_path)}.{uuid.uuid4().hex}.tmp"
     try:
-        # Create directory structure
-        paths = create_directory_structure(temp_dir)
-        
-        # Create manifest
-        create_manifest(paths, course_title, lessons)
-        
-        # Create lesson pages
-        create_lesson_pages(paths, lessons, base_url)
+        _write_package(temp_path, lessons, base_url, course_title, compresslevel)
+        os.replace(temp_path, output_path)
+    finally:
+        # Only still present if building the package failed
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    
+    print(f"Successfully created IMSCC package at: {output_path}")
+    return output_path
+
+
+def main():
+    """
+    Command-line entry point; see the module docstring for usage
+    
+    Returns:
+        int: Process exit status
+    """
+    parser = argparse.ArgumentParser(
+        description="Create an IMS Common Cartridge (.imscc) package from Rise lesson data."
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input', help="CSV or JSON file containing lesson data")
+    source.add_argument('--extract', help="Rise und.js file to extract lesson data from")
+    parser.add_argument('--output', required=True, help="Path for the output .imscc file")
+    parser.add_argument('--base-url', required=True,
+                        help="Base URL to combine with lesson IDs for iframes")
+    parser.add_argument('--title', help="Course title (defaults to the Rise course title)")
+    parser.add_argument('--compress-level', type=int, default=1, choices=range(10),
+                        metavar='{0-9}',
+                        help="Deflate level for the package; 0 stores entries uncompressed, "
+                             "which is fastest when the LMS re-zips the upload (default: 1)")
+    args = parser.parse_args()
+    
+    course_title = args.title
+    
+    if args.extract:
+        base64_content = extract_jsonp_content(args.extract)
+        if not base64_content:
+            return 1
         
-        # Create IMSCC package
-        imscc_path = create_imscc_package(paths, output_path)
+        json_data = decode_base64_content(base64_content)
+        if not json_data:
+            return 1
+        if not isinstance(json_data, dict):
+            print("Decoded content is not a Rise course object")
+            return 1
         
-        print(f"Successfully created IMSCC package at: {imscc_path}")
-        return imscc_path
+        lessons = extract_lesson_data(json_data)
+        if not course_title:
+            course_title = json_data.get('title')
+    else:
+        # --input is always a path; the loader picks the parser from the extension
+        lessons = load_lessons_from_file(args.input)
+    
+    # A JSON file may hold anything under 'lessons', e.g. null
+    if not isinstance(lessons, list):
+        print("Lesson data must be a list of lessons")
+        return 1
+    
+    # Every lesson needs at least a string id to become a page
+    total = len(lessons)
+    lessons = [lesson for lesson in lessons
+               if isinstance(lesson, dict) and isinstance(lesson.get('id'), str)]
+    if len(lessons) < total:
+        print(f"Skipping {total - len(lessons)} lesson(s) without a string id")
+    if not lessons:
+        print("No lesson data found to package")
+        return 1
     
-    finally:
-        # Clean up temporary files if requested
-        if clean_temp and os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+    # Titles become page names, so anything but a string (e.g. null) gets the
+    # same default as a missing title
+    for lesson in lessons:
+        if 'title' in lesson and not isinstance(lesson['title'], str):
+            lesson['title'] = 'Untitled Lesson'
+    
+    create_package(lessons, args.output, args.base_url, course_title=course_title,
+                   compresslevel=args.compress_level)
+    return 0
+
+
+def _streamlit_main():
+    """
+    Status page shown when the script is launched with `streamlit run`
+    """
+    # Imported here so CLI and library use never pay for loading Streamlit
+    import streamlit as st
+    st.title("IMSCC Creator")
+    st.write("This application is running. If you can see this, the script is loaded correctly.")
+
+
+if __name__ == "__main__":
+    # `streamlit run` has already imported streamlit before executing the script
+    if 'streamlit' in sys.modules:
+        _streamlit_main()
+    else:
+        sys.exit(main())
@@ -1,25 +1,78 @@
 import streamlit as st
 import json
-import base64
 import re
-import pandas as pd
 import io
-from collections import Counter
+import csv
+import heapq
+from operator import itemgetter
 
+# Prefer orjson's faster parser when it is installed
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# pybase64 is a drop-in, SIMD-accelerated replacement for the base64 module
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# Literal that precedes the course payload in a well-formed und.js
+_JSONP_PREFIX = b'__resolveJsonp("course:und","'
+
+# Patterns used to locate the course payload in und.js, compiled once at import;
+# they run over the raw uploaded bytes
+_JSONP_RE = re.compile(rb'__resolveJsonp\("course:und","([^"]+)"\)')
+_JSONP_ALT_RE = re.compile(rb'__resolveJsonp\([^,]+,\s*"([^"]+)"\)')
+# Looser patterns tried, in order, when debugging a file that matched neither
+_JSONP_DEBUG_RES = (
+    re.compile(r'__resolveJsonp\(([^,]+),\s*"([^"]+)"\)'),
+    re.compile(r'__resolveJsonp\(([^)]+)\)'),
+    re.compile(r'_resolve\w+\(([^)]+)\)'),
+)
+
+# Number of lessons shown in the table before the "Show all" checkbox is ticked
+_PREVIEW_ROWS = 50
+
+def _preview(content, length):
+    """
+    Decode the start of some raw bytes for display.
+    
+    Args:
+        content (bytes): Raw content
+        length (int): Number of bytes to show
+    
+    Returns:
+        str: The first `length` bytes as text
+    """
+    return content[:length].decode('utf-8', errors='replace')
+
+# Parsing results are cached on the raw input bytes, so widget interactions
+# (which rerun the script) do not re-parse the same upload; messages shown
+# inside the cached functions are replayed on a cache hit
+@st.cache_data(show_spinner=False, max_entries=8)
 def extract_jsonp_content(file_content):
     """
     Extract the base64 encoded content from the und.js file that starts with
     __resolveJsonp("course:und","....").
     
     Args:
-        file_content (str): Content of the und.js file
+        file_content (bytes): Raw content of the und.js file
     
     Returns:
-        str: Extracted base64 content or None if not found
+        bytes: Extracted base64 content or None if not found
     """
-    # Pattern to match __resolveJsonp("course:und","....") format
-    pattern = r'__resolveJsonp\("course:und","([^"]+)"\)'
-    match = re.search(pattern, file_content)
+    # Fast path: find the literal prefix and slice up to the closing '")'
+    start = file_content.find(_JSONP_PREFIX)
+    if start >= 0:
+        start += len(_JSONP_PREFIX)
+        end = file_content.find(b'"', start)
+        if end > start and file_content.startswith(b'")', end):
+            return file_content[start:end]
+    
+    # Match __resolveJsonp("course:und","....") format
+    match = _JSONP_RE.search(file_content)
     
     if match:
         return match.group(1)
@@ -27,40 +80,39 @@ def extract_jsonp_content(file_content):
     # Debug information
     st.error("Failed to extract base64 content from the file")
     st.write("First 200 characters of file:")
-    st.code(file_content[:200])
+    st.code(_preview(file_content, 200))
     
     # Try more flexible pattern as fallback
-    alternative_pattern = r'__resolveJsonp\([^,]+,\s*"([^"]+)"\)'
-    alt_match = re.search(alternative_pattern, file_content)
+    alt_match = _JSONP_ALT_RE.search(file_content)
     if alt_match:
         st.info("Found content with alternative pattern, trying that instead...")
         return alt_match.group(1)
     
     return None
 
+@st.cache_data(show_spinner=False, max_entries=8)
 def decode_base64_content(base64_content):
     """
     Decode base64 content to JSON.
     
     Args:
-        base64_content (str): Base64 encoded content
+        base64_content (bytes): Base64 encoded content
     
     Returns:
         dict: Decoded JSON data or None if decoding fails
     """
     try:
-        # Decode base64 to get JSON string
+        # Decode base64 to get the JSON document
         decoded_bytes = base64.b64decode(base64_content)
-        json_str = decoded_bytes.decode('utf-8')
         
-        # Parse JSON string
-        json_data = json.loads(json_str)
+        # Parse the bytes directly; the parser detects UTF-8 itself
+        json_data = _json_loads(decoded_bytes)
         return json_data
     except Exception as e:
         st.error(f"Error decoding content: {str(e)}")
         # Try to show the first part of the base64 string for debugging
         st.write("First 50 characters of base64 content:")
-        st.code(base64_content[:50])
+        st.code(_preview(base64_content, 50))
         return None
 
 def analyze_json_structure(json_data):
@@ -100,6 +152,29 @@ def analyze_json_structure(json_data):
     
     return structure_info
 
+def _json_sample(json_data, length):
+    """
+    Get the start of the indented JSON dump of some data without
+    serializing all of it.
+    
+    Args:
+        json_data (dict): The data to dump
+        length (int): Number of characters to return
+    
+    Returns:
+        str: The first `length` characters of json.dumps(json_data, indent=2)
+    """
+    # With indent set the encoder yields its output piece by piece, so it
+    # can be stopped as soon as enough has been produced
+    parts = []
+    size = 0
+    for part in json.JSONEncoder(indent=2).iterencode(json_data):
+        parts.append(part)
+        size += len(part)
+        if size >= length:
+            break
+    return ''.join(parts)[:length]
+
 def extract_lesson_data(json_data, debug=False):
     """
     Extract lesson titles and IDs from the decoded JSON data.
@@ -133,28 +208,28 @@ def extract_lesson_data(json_data, debug=False):
     
     # Method 2: Look for arrays that might contain lessons
     if not lessons:
-        candidates = []
+        # Keep only the best (proportion, key, value) seen so far
+        best = (0.0, None, None)
         for key, value in json_data.items():
             if isinstance(value, list) and len(value) > 0:
                 # Check first few items to see if they look like lessons
-                sample_size = min(5, len(value))
-                sample_items = value[:sample_size]
+                sample_items = value[:5]
                 
                 has_title_id = sum(1 for item in sample_items 
                                  if isinstance(item, dict) and 'title' in item and 'id' in item)
                 
-                if has_title_id > 0:
-                    candidates.append((key, value, has_title_id/sample_size))
-        
-        # Sort candidates by the proportion that have title and id
-        candidates.sort(key=lambda x: x[2], reverse=True)
+                proportion = has_title_id / len(sample_items)
+                if proportion > best[0]:
+                    best = (proportion, key, value)
+                    # Nothing can beat a full match
+                    if proportion == 1.0:
+                        break
         
-        if candidates:
-            best_candidate = candidates[0]
-            lessons = best_candidate[1]
+        if best[2] is not None:
+            lessons = best[2]
             if debug:
-                st.success(f"Found potential lessons array in '{best_candidate[0]}' with {len(lessons)} items")
-                st.write(f"Match confidence: {best_candidate[2]*100:.1f}%")
+                st.success(f"Found potential lessons array in '{best[1]}' with {len(lessons)} items")
+                st.write(f"Match confidence: {best[0]*100:.1f}%")
     
     # Method 3: Deep search for arrays of objects with title and id
     if not lessons and debug:
@@ -162,34 +237,44 @@ def extract_lesson_data(json_data, debug=False):
         
         def find_lesson_arrays(obj, path="root"):
             results = []
+            # Walk the tree with an explicit stack rather than recursion; children
+            # are pushed in reverse so they are visited in document order
+            stack = [(obj, path)]
+            pop = stack.pop
             
-            if isinstance(obj, dict):
-                for key, value in obj.items():
-                    new_path = f"{path}.{key}"
-                    results.extend(find_lesson_arrays(value, new_path))
-            
-            elif isinstance(obj, list) and len(obj) > 0 and isinstance(obj[0], dict):
-                # Check if this array has items with title and id
-                sample_size = min(5, len(obj))
-                sample_items = obj[:sample_size]
-                has_title_id = sum(1 for item in sample_items 
-                                if 'title' in item and 'id' in item)
+            while stack:
+                obj, path = pop()
                 
-                if has_title_id > 0:
-                    results.append((path, obj, has_title_id/sample_size))
+                # The tree comes straight from the JSON parser, so exact type
+                # checks are safe and cheaper than isinstance on every node
+                obj_type = type(obj)
+                if obj_type is dict:
+                    stack.extend((value, f"{path}.{key}") for key, value in reversed(obj.items()))
                 
-                # Also check children
-                for i, item in enumerate(obj[:3]):  # Only check first few items
-                    results.extend(find_lesson_arrays(item, f"{path}[{i}]"))
+                elif obj_type is list and len(obj) > 0 and type(obj[0]) is dict:
+                    # Check if this array has items with title and id
+                    sample_size = min(5, len(obj))
+                    sample_items = obj[:sample_size]
+                    has_title_id = sum(1 for item in sample_items 
+                                    if 'title' in item and 'id' in item)
+                    
+                    if has_title_id > 0:
+                        results.append((path, obj, has_title_id/sample_size))
+                    
+                    # Also check children
+                    children = obj[:3]  # Only check first few items
+                    for i in range(len(children) - 1, -1, -1):
+                        stack.append((children[i], f"{path}[{i}]"))
             
             return results
         
-        deep_candidates = find_lesson_arrays(json_data)
-        deep_candidates.sort(key=lambda x: x[2], reverse=True)
+        # Only the three most confident arrays are shown and the first is used,
+        # so select those instead of sorting every candidate
+        deep_candidates = heapq.nlargest(3, find_lesson_arrays(json_data), key=itemgetter(2))
         
         if deep_candidates:
             st.write("Found nested lesson-like arrays:")
-            for path, arr, confidence in deep_candidates[:3]:
+            for path, arr, confidence in deep_candidates:
                 st.write(f"- Path: {path}, Items: {len(arr)}, Confidence: {confidence*100:.1f}%")
             
             best_deep = deep_candidates[0]
@@ -197,21 +282,11 @@ def extract_lesson_data(json_data, debug=False):
                 lessons = best_deep[1]
                 st.success(f"Using deep search result: {best_deep[0]}")
     
-    # Extract data from the lessons if found
+    # Extract id and title (when present) from lessons that have at least an id
     if lessons:
-        for lesson in lessons:
-            if isinstance(lesson, dict):
-                lesson_data = {}
-                
-                # Always include id and title if available
-                if 'id' in lesson:
-                    lesson_data['id'] = lesson['id']
-                if 'title' in lesson:
-                    lesson_data['title'] = lesson['title']
-                
-                # Only add if we have at least an id
-                if 'id' in lesson_data:
-                    lessons_data.append(lesson_data)
+        lessons_data = [{key: lesson[key] for key in ('id', 'title') if key in lesson}
+                        for lesson in lessons
+                        if isinstance(lesson, dict) and 'id' in lesson]
     
     # Debug: If no lessons found, show sample data
     if debug and not lessons_data:
@@ -219,7 +294,7 @@ def extract_lesson_data(json_data, debug=False):
         
         # Show a sample of the JSON structure for troubleshooting
         st.write("### Sample of JSON Data")
-        st.json(json.dumps(json_data, indent=2)[:1000] + "...")
+        st.json(_json_sample(json_data, 1000) + "...")
     
     return lessons_data
 
@@ -233,9 +308,15 @@ def get_downloadable_csv(lessons_data):
     Returns:
         str: CSV data as a string
     """
-    df = pd.DataFrame(lessons_data)
-    csv = df.to_csv(index=False)
-    return csv
+    # Columns in order of first appearance, as a DataFrame would lay them out;
+    # lessons without a title get an empty cell
+    fieldnames = list(dict.fromkeys(key for lesson in lessons_data for key in lesson))
+    
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=fieldnames, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(lessons_data)
+    return output.getvalue()
 
 def main():
     st.title("Rise Course Lesson Extractor")
@@ -253,15 +334,16 @@ def main():
     uploaded_file = st.file_uploader("Choose your und.js file", type=['js'])
     
     if uploaded_file is not None:
-        # Read file content
-        file_content = uploaded_file.getvalue().decode('utf-8')
+        # Read file content; it stays as bytes, and only the payload and the
+        # previews are ever decoded
+        file_content = uploaded_file.getvalue()
         
         # Show file info in debug mode
         if debug_mode:
             file_size = len(file_content)
             st.write(f"File size: {file_size} bytes")
             st.write("File preview (first 200 characters):")
-            st.code(file_content[:200])
+            st.code(_preview(file_content, 200))
         
         # Extract base64 content
         base64_content = extract_jsonp_content(file_content)
@@ -270,7 +352,7 @@ def main():
             if debug_mode:
                 st.write(f"Base64 content length: {len(base64_content)} bytes")
                 st.write("Base64 preview (first 50 characters):")
-                st.code(base64_content[:50])
+                st.code(_preview(base64_content, 50))
             
             with st.spinner("Decoding and extracting lesson data..."):
                 # Decode base64 to get JSON
@@ -285,21 +367,31 @@ def main():
                         
                         # Display in a table
                         st.write("Extracted Lesson Information:")
-                        lesson_df = pd.DataFrame(lessons_data)
+                        # pandas is only needed for this table, so it is imported
+                        # on first use rather than at app start-up
+                        import pandas as pd
+                        # Long courses only show their first rows unless asked,
+                        # since the whole table is sent to the browser
+                        table_rows = lessons_data
+                        if len(lessons_data) > _PREVIEW_ROWS:
+                            if not st.checkbox(f"Show all {len(lessons_data)} lessons"):
+                                table_rows = lessons_data[:_PREVIEW_ROWS]
+                                st.write(f"Showing the first {_PREVIEW_ROWS} lessons.")
+                        lesson_df = pd.DataFrame.from_records(table_rows, columns=['id', 'title'])
                         st.dataframe(lesson_df)
                         
                         # Provide download links
-                        csv = get_downloadable_csv(lessons_data)
+                        csv_data = get_downloadable_csv(lessons_data)
                         st.download_button(
                             label="Download as CSV",
-                            data=csv,
+                            data=csv_data,
                             file_name="lesson_data.csv",
                             mime="text/csv"
                         )
                         
-                        # Text output option
+                        # Text output option; every extracted lesson has an id
                         text_output = "\n".join([f"{lesson.get('title', 'No Title')} - {lesson['id']}" 
-                                               for lesson in lessons_data if 'id' in lesson])
+                                               for lesson in lessons_data])
                         st.download_button(
                             label="Download as Text",
                             data=text_output,
@@ -322,16 +414,11 @@ def main():
             if debug_mode:
                 # Try alternative pattern search
                 st.write("Trying to find any jsonp pattern...")
-                jsonp_patterns = [
-                    r'__resolveJsonp\(([^,]+),\s*"([^"]+)"\)',
-                    r'__resolveJsonp\(([^)]+)\)',
-                    r'_resolve\w+\(([^)]+)\)'
-                ]
-                
-                for pattern in jsonp_patterns:
-                    matches = re.findall(pattern, file_content)
+                file_text = file_content.decode('utf-8', errors='replace')
+                for pattern in _JSONP_DEBUG_RES:
+                    matches = pattern.findall(file_text)
                     if matches:
-                        st.write(f"Found potential matches with pattern: {pattern}")
+                        st.write(f"Found potential matches with pattern: {pattern.pattern}")
                         st.write(f"First few matches: {matches[:2]}")
                         break
 
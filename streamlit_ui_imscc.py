@@ -9,17 +9,170 @@ st.set_page_config(
 
 # Now import other libraries
 import os
-import tempfile
 import base64
-import json
 import re
 import pandas as pd
 import sys
 import io
+import json
+
+# orjson parses faster when it is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Import the IMSCC creator module - make sure imscc_creator.py is in the same directory
 import imscc_creator
 
+# Characters replaced with '_' in download file names: spaces, plus the ones
+# Windows does not allow in file names
+_SAFE_FILENAME_TABLE = str.maketrans({c: '_' for c in ' /\\:*?"<>|'})
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def load_und(file_bytes):
+    """
+    Extract the lesson data from the contents of an uploaded und.js file.
+    
+    Cached on the file bytes, so widget interactions (which rerun the script)
+    do not decode and parse the same upload again.
+    
+    Args:
+        file_bytes (bytes): Raw content of the und.js file
+    
+    Returns:
+        dict: 'decoded' (whether the content decoded to JSON), the course
+        'title', 'lessons' and 'lessons_df' (the table shown to the user), or
+        None if no encoded data was found. The decoded course itself is not
+        kept, since the cache would copy all of it on every rerun
+    """
+    base64_content = imscc_creator.find_jsonp_payload(file_bytes)
+    if not base64_content:
+        return None
+    
+    json_data = imscc_creator.decode_base64_content(base64_content)
+    if not json_data:
+        return {"decoded": False, "title": None, "lessons": [], "lessons_df": None}
+    
+    lessons_data = imscc_creator.extract_lesson_data(json_data)
+    lessons_df = pd.DataFrame.from_records(lessons_data, columns=['id', 'title'])
+    return {
+        "decoded": True,
+        "title": json_data.get('title', 'Rise Course Export'),
+        "lessons": lessons_data,
+        "lessons_df": lessons_df,
+    }
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def parse_json_upload(file_bytes):
+    """
+    Parse the contents of an uploaded JSON lesson file, cached on the bytes.
+    
+    Args:
+        file_bytes (bytes): Raw content of the JSON file
+    
+    Returns:
+        The parsed JSON data
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(file_bytes)
+        except orjson.JSONDecodeError:
+            # orjson rejects some files the json module accepts, such as a
+            # leading UTF-8 BOM or NaN/Infinity; let json have the final say
+            pass
+    return json.loads(file_bytes)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def build_package(lessons_data, base_url, course_title):
+    """
+    Build the IMSCC package in memory.
+    
+    Cached on its arguments, so pressing the button again with the same
+    lessons and settings hands back the package that was already built.
+    
+    Args:
+        lessons_data (list): Lessons to include in the package
+        base_url (str): Base URL for the lesson iframes
+        course_title (str): Title of the course
+    
+    Returns:
+        bytes: The IMSCC (zip) file content
+    """
+    # There is nothing to write to disk and read back for the download
+    imscc_buffer = io.BytesIO()
+    imscc_creator.create_package(
+        lessons_data,
+        imscc_buffer,
+        base_url,
+        course_title=course_title
+    )
+    return imscc_buffer.getvalue()
+
+def render_package_ui(lessons_data, default_title, key_prefix):
+    """
+    Show the package settings form and, once submitted, build the IMSCC
+    package and offer it for download. Shared by all three tabs.
+    
+    Args:
+        lessons_data (list): Lessons to include in the package
+        default_title (str): Initial value of the course title field
+        key_prefix (str): Prefix for the widget keys, unique per tab
+    """
+    # Collect the package settings in a form, so editing them does not
+    # rerun the script until the button is pressed
+    with st.form(f"{key_prefix}_form"):
+        # Course title input
+        course_title = st.text_input(
+            "Course title",
+            value=default_title,
+            key=f"{key_prefix}_title"
+        )
+        
+        # Base URL input
+        base_url = st.text_input(
+            "Base URL for iframes (will be combined with lesson IDs)",
+            placeholder="https://example.com/rise/scorm/",
+            key=f"{key_prefix}_url"
+        )
+        
+        # Create IMSCC package button
+        submitted = st.form_submit_button("Create IMSCC Package")
+    
+    if not submitted:
+        return
+    if not base_url:
+        st.error("Please provide a base URL for the iframes.")
+        return
+    
+    with st.spinner("Creating IMSCC package..."):
+        try:
+            imscc_bytes = build_package(lessons_data, base_url, course_title)
+            
+            st.success("IMSCC package created successfully!")
+            
+            # Provide download button
+            safe_filename = course_title.translate(_SAFE_FILENAME_TABLE)
+            st.download_button(
+                label="Download IMSCC Package",
+                data=imscc_bytes,
+                file_name=f"{safe_filename}.imscc",
+                mime="application/zip",
+                key=f"{key_prefix}_download"
+            )
+            
+            # Description of what was created
+            st.info(f"""
+            The IMSCC package contains {len(lessons_data)} pages, one for each lesson.
+            Each page has an iframe that points to: {base_url}/[lesson_id]
+            
+            This package can be imported into Canvas, Blackboard, Moodle, and other LMS 
+            systems that support IMS Common Cartridge format.
+            """)
+        except Exception as e:
+            st.error(f"Error creating IMSCC package: {str(e)}")
+            st.exception(e)
+
 # Main title and description
 st.title("Rise Course IMSCC Creator")
 st.markdown("""
@@ -45,113 +198,42 @@ with tab1:
     if und_file:
         st.success(f"Uploaded: {und_file.name}")
         
-        # Read file content
-        file_content = und_file.getvalue().decode('utf-8')
+        # Read file content (kept as bytes; nothing here needs the text)
+        file_content = und_file.getvalue()
         
         # Show file info
         file_size = len(file_content)
         st.write(f"File size: {file_size} bytes")
         
-        # Extract base64 content
-        with st.spinner("Extracting encoded data..."):
-            # Use the extraction function from imscc_creator
-            # First save the file to a temporary location
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.js') as temp_file:
-                temp_file.write(und_file.getvalue())
-                temp_path = temp_file.name
+        # Extract the lesson data; cached, so reruns skip the decoding
+        try:
+            with st.spinner("Extracting lesson data..."):
+                und_data = load_und(file_content)
             
-            try:
-                base64_content = imscc_creator.extract_jsonp_content(temp_path)
-                if base64_content:
-                    st.success("Found encoded data in the file!")
+            if und_data:
+                st.success("Found encoded data in the file!")
+                
+                if und_data["decoded"]:
+                    lessons_data = und_data["lessons"]
                     
-                    # Decode base64 to get JSON
-                    with st.spinner("Decoding data..."):
-                        json_data = imscc_creator.decode_base64_content(base64_content)
+                    if lessons_data:
+                        st.success(f"Successfully extracted {len(lessons_data)} lessons!")
+                        
+                        # Display in a table
+                        st.write("Extracted Lesson Information:")
+                        st.dataframe(und_data["lessons_df"])
                         
-                        if json_data:
-                            # Extract lesson data
-                            with st.spinner("Extracting lesson data..."):
-                                lessons_data = imscc_creator.extract_lesson_data(json_data)
-                                
-                                if lessons_data:
-                                    st.success(f"Successfully extracted {len(lessons_data)} lessons!")
-                                    
-                                    # Display in a table
-                                    st.write("Extracted Lesson Information:")
-                                    lesson_df = pd.DataFrame(lessons_data)
-                                    st.dataframe(lesson_df)
-                                    
-                                    # Course title input
-                                    course_title = st.text_input(
-                                        "Course title",
-                                        value=json_data.get('title', 'Rise Course Export')
-                                    )
-                                    
-                                    # Base URL input
-                                    base_url = st.text_input(
-                                        "Base URL for iframes (will be combined with lesson IDs)",
-                                        placeholder="https://example.com/rise/scorm/"
-                                    )
-                                    
-                                    # Create IMSCC package button
-                                    if st.button("Create IMSCC Package"):
-                                        if not base_url:
-                                            st.error("Please provide a base URL for the iframes.")
-                                        else:
-                                            with st.spinner("Creating IMSCC package..."):
-                                                # Create a temporary directory for the output
-                                                with tempfile.TemporaryDirectory() as temp_dir:
-                                                    output_path = os.path.join(temp_dir, "rise_course.imscc")
-                                                    
-                                                    try:
-                                                        # Create the IMSCC package using the imported function
-                                                        imscc_creator.create_package(
-                                                            lessons_data,
-                                                            output_path,
-                                                            base_url,
-                                                            course_title=course_title
-                                                        )
-                                                        
-                                                        # Read the created file for download
-                                                        with open(output_path, "rb") as f:
-                                                            imscc_bytes = f.read()
-                                                        
-                                                        st.success("IMSCC package created successfully!")
-                                                        
-                                                        # Provide download button
-                                                        safe_filename = course_title.replace(' ', '_')
-                                                        st.download_button(
-                                                            label="Download IMSCC Package",
-                                                            data=imscc_bytes,
-                                                            file_name=f"{safe_filename}.imscc",
-                                                            mime="application/zip"
-                                                        )
-                                                        
-                                                        # Description of what was created
-                                                        st.info(f"""
-                                                        The IMSCC package contains {len(lessons_data)} pages, one for each lesson.
-                                                        Each page has an iframe that points to: {base_url}/[lesson_id]
-                                                        
-                                                        This package can be imported into Canvas, Blackboard, Moodle, and other LMS 
-                                                        systems that support IMS Common Cartridge format.
-                                                        """)
-                                                    except Exception as e:
-                                                        st.error(f"Error creating IMSCC package: {str(e)}")
-                                                        st.exception(e)
-                                else:
-                                    st.warning("No lesson data found in the file.")
-                        else:
-                            st.error("Failed to decode the base64 content.")
+                        # Course title and base URL form, then the package download
+                        render_package_ui(lessons_data, und_data["title"], "und")
+                    else:
+                        st.warning("No lesson data found in the file.")
                 else:
-                    st.error("Could not find the expected format in the file.")
-            except Exception as e:
-                st.error(f"Error processing file: {str(e)}")
-                st.exception(e)
-            finally:
-                # Clean up the temporary file
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
+                    st.error("Failed to decode the base64 content.")
+            else:
+                st.error("Could not find the expected format in the file.")
+        except Exception as e:
+            st.error(f"Error processing file: {str(e)}")
+            st.exception(e)
 
 with tab2:
     st.header("Upload CSV")
@@ -168,7 +250,10 @@ with tab2:
         
         # Read CSV file
         try:
-            df = pd.read_csv(csv_file)
+            # Lesson ids become URLs, file names and hashes, so read every column
+            # as the text written in the file (the C engine applies dtype=str at
+            # parse time, keeping ids such as '001' intact)
+            df = pd.read_csv(csv_file, dtype=str)
             
             # Check if it has the required columns
             if 'id' not in df.columns:
@@ -179,77 +264,20 @@ with tab2:
                 st.dataframe(df)
                 
                 # Convert to the format expected by imscc_creator
-                lessons_data = []
-                for _, row in df.iterrows():
-                    lesson = {'id': row['id']}
-                    if 'title' in df.columns:
-                        lesson['title'] = row['title']
-                    else:
-                        lesson['title'] = f"Lesson {row['id']}"
-                    lessons_data.append(lesson)
+                # (one vectorized call instead of building a Series per row)
+                # Lessons without a title (no column, a blank cell or a short
+                # row) get a "Lesson <id>" default
+                default_titles = 'Lesson ' + df['id'].astype(str)
+                if 'title' not in df.columns:
+                    df = df.assign(title=default_titles)
+                else:
+                    df = df.assign(title=df['title'].fillna(default_titles))
+                lessons_data = df[['id', 'title']].to_dict('records')
                 
                 st.success(f"Found {len(lessons_data)} lessons in the CSV file.")
                 
-                # Course title input
-                course_title = st.text_input(
-                    "Course title",
-                    value=os.path.splitext(csv_file.name)[0],
-                    key="csv_title"
-                )
-                
-                # Base URL input
-                base_url = st.text_input(
-                    "Base URL for iframes (will be combined with lesson IDs)",
-                    placeholder="https://example.com/rise/scorm/",
-                    key="csv_url"
-                )
-                
-                # Create IMSCC package button
-                if st.button("Create IMSCC Package", key="csv_button"):
-                    if not base_url:
-                        st.error("Please provide a base URL for the iframes.")
-                    else:
-                        with st.spinner("Creating IMSCC package..."):
-                            # Create a temporary directory for the output
-                            with tempfile.TemporaryDirectory() as temp_dir:
-                                output_path = os.path.join(temp_dir, "rise_course.imscc")
-                                
-                                try:
-                                    # Create the IMSCC package using the imported function
-                                    imscc_creator.create_package(
-                                        lessons_data,
-                                        output_path,
-                                        base_url,
-                                        course_title=course_title
-                                    )
-                                    
-                                    # Read the created file for download
-                                    with open(output_path, "rb") as f:
-                                        imscc_bytes = f.read()
-                                    
-                                    st.success("IMSCC package created successfully!")
-                                    
-                                    # Provide download button
-                                    safe_filename = course_title.replace(' ', '_')
-                                    st.download_button(
-                                        label="Download IMSCC Package",
-                                        data=imscc_bytes,
-                                        file_name=f"{safe_filename}.imscc",
-                                        mime="application/zip",
-                                        key="csv_download"
-                                    )
-                                    
-                                    # Description of what was created
-                                    st.info(f"""
-                                    The IMSCC package contains {len(lessons_data)} pages, one for each lesson.
-                                    Each page has an iframe that points to: {base_url}/[lesson_id]
-                                    
-                                    This package can be imported into Canvas, Blackboard, Moodle, and other LMS 
-                                    systems that support IMS Common Cartridge format.
-                                    """)
-                                except Exception as e:
-                                    st.error(f"Error creating IMSCC package: {str(e)}")
-                                    st.exception(e)
+                # Course title and base URL form, then the package download
+                render_package_ui(lessons_data, os.path.splitext(csv_file.name)[0], "csv")
         
         except Exception as e:
             st.error(f"Error reading CSV file: {str(e)}")
@@ -270,7 +298,7 @@ with tab3:
         
         # Read JSON file
         try:
-            json_data = json.load(json_file)
+            json_data = parse_json_upload(json_file.getvalue())
             
             # Check the structure and extract lessons array
             if isinstance(json_data, list):
@@ -306,66 +334,8 @@ with tab3:
                     
                     st.success(f"Found {len(valid_lessons)} lessons in the JSON file.")
                     
-                    # Course title input
-                    course_title = st.text_input(
-                        "Course title",
-                        value=os.path.splitext(json_file.name)[0] if json_file else "Rise Course Export",
-                        key="json_title"
-                    )
-                    
-                    # Base URL input
-                    base_url = st.text_input(
-                        "Base URL for iframes (will be combined with lesson IDs)",
-                        placeholder="https://example.com/rise/scorm/",
-                        key="json_url"
-                    )
-                    
-                    # Create IMSCC package button
-                    if st.button("Create IMSCC Package", key="json_button"):
-                        if not base_url:
-                            st.error("Please provide a base URL for the iframes.")
-                        else:
-                            with st.spinner("Creating IMSCC package..."):
-                                # Create a temporary directory for the output
-                                with tempfile.TemporaryDirectory() as temp_dir:
-                                    output_path = os.path.join(temp_dir, "rise_course.imscc")
-                                    
-                                    try:
-                                        # Create the IMSCC package using the imported function
-                                        imscc_creator.create_package(
-                                            valid_lessons,
-                                            output_path,
-                                            base_url,
-                                            course_title=course_title
-                                        )
-                                        
-                                        # Read the created file for download
-                                        with open(output_path, "rb") as f:
-                                            imscc_bytes = f.read()
-                                        
-                                        st.success("IMSCC package created successfully!")
-                                        
-                                        # Provide download button
-                                        safe_filename = course_title.replace(' ', '_')
-                                        st.download_button(
-                                            label="Download IMSCC Package",
-                                            data=imscc_bytes,
-                                            file_name=f"{safe_filename}.imscc",
-                                            mime="application/zip",
-                                            key="json_download"
-                                        )
-                                        
-                                        # Description of what was created
-                                        st.info(f"""
-                                        The IMSCC package contains {len(valid_lessons)} pages, one for each lesson.
-                                        Each page has an iframe that points to: {base_url}/[lesson_id]
-                                        
-                                        This package can be imported into Canvas, Blackboard, Moodle, and other LMS 
-                                        systems that support IMS Common Cartridge format.
-                                        """)
-                                    except Exception as e:
-                                        st.error(f"Error creating IMSCC package: {str(e)}")
-                                        st.exception(e)
+                    # Course title and base URL form, then the package download
+                    render_package_ui(valid_lessons, os.path.splitext(json_file.name)[0], "json")
         
         except Exception as e:
             st.error(f"Error reading JSON file: {str(e)}")
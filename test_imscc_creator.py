@@ -0,0 +1,81 @@
+"""
+Tests for the imscc_creator command-line entry point
+
+Run with: python -m unittest test_imscc_creator
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import imscc_creator
+
+
+class MainTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.output_path = os.path.join(self.temp_dir.name, 'course.imscc')
+
+    def write_input(self, name, content):
+        """Write an input file into the temporary directory and return its path"""
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def run_main(self, input_path):
+        """Run main() on an input file; returns the exit status and printed output"""
+        argv = ['imscc_creator.py', '--input', input_path, '--output', self.output_path,
+                '--base-url', 'https://example.com/', '--title', 'Course']
+        output = io.StringIO()
+        with mock.patch.object(sys, 'argv', argv), contextlib.redirect_stdout(output):
+            status = imscc_creator.main()
+        return status, output.getvalue()
+
+    def lesson_titles(self):
+        """Return the lesson titles in the package manifest"""
+        with zipfile.ZipFile(self.output_path) as imscc_zip:
+            manifest = imscc_zip.read('imsmanifest.xml').decode('utf-8')
+        titles = [line.strip() for line in manifest.splitlines()
+                  if line.strip().startswith('<title>')]
+        # The first title is the course module's
+        return titles[1:]
+
+    def test_json_with_null_lessons_is_rejected(self):
+        input_path = self.write_input('lessons.json', json.dumps({'lessons': None}))
+
+        status, output = self.run_main(input_path)
+
+        self.assertEqual(status, 1)
+        self.assertIn("Lesson data must be a list of lessons", output)
+        self.assertFalse(os.path.exists(self.output_path))
+
+    def test_json_lesson_with_null_title_gets_default(self):
+        input_path = self.write_input('lessons.json', json.dumps(
+            [{'id': 'abc', 'title': None}, {'id': 'def', 'title': 'Two'}]))
+
+        status, _ = self.run_main(input_path)
+
+        self.assertEqual(status, 0)
+        self.assertEqual(self.lesson_titles(),
+                         ['<title>Untitled Lesson</title>', '<title>Two</title>'])
+
+    def test_csv_short_row_gets_default_title(self):
+        input_path = self.write_input('lessons.csv', 'id,title\nl1,Intro\nl2\n')
+
+        status, _ = self.run_main(input_path)
+
+        self.assertEqual(status, 0)
+        self.assertEqual(self.lesson_titles(),
+                         ['<title>Intro</title>', '<title>Untitled Lesson</title>'])
+
+
+if __name__ == '__main__':
+    unittest.main()